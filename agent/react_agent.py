@@ -7,6 +7,8 @@ from agent.tools.read import read
 from agent.tools.grep import grep
 from agent.tools.ls import ls
 from agent.tools.glob import glob
+from agent.tools.search import search
+from agent.tools.symbols import outline, find_definition
 
 def create_agent():
     chat_model = llm_model
@@ -15,6 +17,9 @@ def create_agent():
         ls,
         grep,
         glob,
+        search,
+        outline,
+        find_definition,
         read,
     ]
     agent = create_react_agent(
@@ -0,0 +1,48 @@
+import os
+from typing import List
+from langchain_core.tools import tool
+from utils.index_store import IndexCache
+from utils.search_index import SearchIndex, SearchHit
+
+# 单次查询返回结果数的上限，每个结果都需要读取文件生成片段
+MAX_TOP_K = 50
+
+_index_cache = IndexCache(SearchIndex)
+
+
+@tool(parse_docstring=True)
+def search(path: str, query: str, top_k: int = 10) -> List[SearchHit]:
+    """
+    一个离线的代码相关性搜索工具，不依赖网络或向量服务。
+    它基于本地倒排索引，使用 BM25 算法按相关性返回最匹配的文件及代码片段。
+    查询可以是自然语言（中英文均可）或标识符，标识符会按 camelCase 和 snake_case 拆分匹配。
+    当不确定关键字、需要按相关性定位文件时，优先使用该工具而不是 grep。
+
+    Args:
+        path: 要搜索的目录。如果为空，则默认为当前工作目录。
+        query: 搜索内容，例如 "prompt template" 或 "加载提示词模板"。
+        top_k: 返回的最大文件数量，最多 50。
+
+    Returns:
+        List[SearchHit]: 按相关性排序（最相关的在前）的结果列表，每项包含相对路径、得分和 "行号: 内容" 形式的代码片段。
+
+    Raises:
+        FileNotFoundError: 如果指定的目录不存在。
+        NotADirectoryError: 如果指定的路径不是一个目录。
+    """
+    # 如果路径未指定，则使用当前工作目录
+    if not path:
+        path = os.getcwd()
+
+    if not os.path.isdir(path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"directory does not exist: {path}")
+        raise NotADirectoryError(f"path is not a directory: {path}")
+
+    if top_k <= 0:
+        top_k = 10
+    top_k = min(top_k, MAX_TOP_K)
+
+    # 统一使用真实路径作为索引键，经符号链接访问同一目录时复用同一份索引
+    index = _index_cache.get(os.path.realpath(path))
+    return index.search(query, top_k)
@@ -0,0 +1,81 @@
+import os
+from typing import List
+from langchain_core.tools import tool
+from utils.index_store import IndexCache
+from utils.symbol_index import SymbolIndex, Symbol, is_supported
+
+_index_cache = IndexCache(SymbolIndex)
+
+
+@tool(parse_docstring=True)
+def outline(file_path: str) -> List[Symbol]:
+    """
+    获取单个源文件的大纲：其中定义的类、函数、方法等符号及其行号和签名。
+    在需要了解文件结构时，先使用该工具，再用 read 按行号读取需要的部分，而不是读取整个文件。
+    支持 Python、JavaScript/TypeScript、Go、Rust、Java、Kotlin、C/C++、Ruby 和 PHP。
+
+    Args:
+        file_path: 要获取大纲的文件的绝对路径。
+
+    Returns:
+        List[Symbol]: 按行号排序的符号列表，每项包含名称、限定名、类型、起止行号和签名。
+
+    Raises:
+        ValueError: 如果 file_path 不是绝对路径，或文件类型不受支持。
+        FileNotFoundError: 如果文件不存在。
+        IsADirectoryError: 如果路径是一个目录。
+    """
+    if not os.path.isabs(file_path):
+        raise ValueError(f"file_path must be an absolute path, got: {file_path}")
+
+    file_path = os.path.realpath(file_path)
+
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"file does not exist: {file_path}")
+
+    if os.path.isdir(file_path):
+        raise IsADirectoryError(f"path is a directory, not a file: {file_path}")
+
+    if not is_supported(file_path):
+        raise ValueError(f"unsupported file type: {file_path}")
+
+    # 优先复用当前工作目录的索引，工作目录之外的文件以其所在目录为索引根目录
+    cwd = os.path.realpath(os.getcwd())
+    root = cwd if os.path.commonpath([cwd, file_path]) == cwd else os.path.dirname(file_path)
+    rel_path = os.path.relpath(file_path, root)
+
+    # 大纲只需要单个文件，跳过全量扫描，按需刷新该文件即可
+    index = _index_cache.get(root, refresh=False)
+    index.refresh_file(rel_path)
+    return index.outline(rel_path)
+
+
+@tool(parse_docstring=True)
+def find_definition(path: str, name: str) -> List[Symbol]:
+    """
+    查找类、函数或方法的定义位置，基于本地持久化的符号索引，一次调用即可定位，无需 grep 后再读取整个文件。
+    名称不区分大小写，可以是简单名称（如 "read"）或限定名（如 "SearchIndex.update"）。
+
+    Args:
+        path: 要搜索的目录。如果为空，则默认为当前工作目录。
+        name: 要查找的符号名称。
+
+    Returns:
+        List[Symbol]: 匹配的定义列表，每项包含相对路径、类型、起止行号和签名。
+
+    Raises:
+        FileNotFoundError: 如果指定的目录不存在。
+        NotADirectoryError: 如果指定的路径不是一个目录。
+    """
+    # 如果路径未指定，则使用当前工作目录
+    if not path:
+        path = os.getcwd()
+
+    if not os.path.isdir(path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"directory does not exist: {path}")
+        raise NotADirectoryError(f"path is not a directory: {path}")
+
+    # 统一使用真实路径作为索引键，经符号链接访问同一目录时复用同一份索引
+    index = _index_cache.get(os.path.realpath(path))
+    return index.find_definition(name.strip())
@@ -0,0 +1,213 @@
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Generic, Iterable, Iterator, List, Optional, TypeVar
+
+
+# 索引统一存放在用户缓存目录中，按根目录的绝对路径区分，不向被搜索的目录写入任何文件
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "popoagent",
+)
+
+# 其他进程正在写入同一索引时的最长等待时间（秒）
+BUSY_TIMEOUT = 60
+
+# 待处理文件数超过该阈值时（通常是首次构建）使用多进程并行处理
+PARALLEL_THRESHOLD = 200
+# 并行处理的最大进程数
+MAX_WORKERS = 8
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def _index_db_path(root: str, file_name: str) -> Optional[str]:
+    """返回索引数据库文件路径；缓存目录不可写时返回 None。"""
+    key = hashlib.sha1(root.encode('utf-8')).hexdigest()[:16]
+    index_dir = os.path.join(CACHE_DIR, key)
+    try:
+        os.makedirs(index_dir, exist_ok=True)
+    except OSError:
+        return None
+    if not os.access(index_dir, os.W_OK):
+        return None
+    return os.path.join(index_dir, file_name)
+
+
+def _remove_db_files(db_path: str):
+    """删除数据库文件及其 WAL 辅助文件。"""
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(db_path + suffix)
+        except OSError:
+            pass
+
+
+def _connect_file(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def _init_schema(conn: sqlite3.Connection, schema: str, version: int):
+    conn.executescript(schema)
+    conn.execute(f"PRAGMA user_version = {int(version)}")
+    conn.commit()
+
+
+def connect_index(root: str, file_name: str) -> sqlite3.Connection:
+    """
+    打开指定根目录的索引数据库（不做结构校验）。
+    连接允许跨线程使用（调用方需自行加锁），文件数据库启用 WAL 以减少多进程间的锁等待；
+    缓存目录不可写时退回到内存数据库。
+
+    参数:
+    - root: 索引的根目录（绝对路径）。
+    - file_name: 索引数据库文件名。
+
+    返回:
+    - sqlite3.Connection: 数据库连接。
+    """
+    db_path = _index_db_path(root, file_name)
+    if db_path is not None:
+        try:
+            return _connect_file(db_path)
+        except sqlite3.Error:
+            pass
+    return sqlite3.connect(":memory:", check_same_thread=False)
+
+
+def open_index_db(root: str, file_name: str, schema: str, version: int) -> sqlite3.Connection:
+    """
+    打开索引数据库并确保表结构为指定版本。
+    结构版本（PRAGMA user_version）不一致或数据库文件损坏时删除后重建，
+    仍然失败或缓存目录不可写时退回到内存数据库。
+
+    参数:
+    - root: 索引的根目录（绝对路径）。
+    - file_name: 索引数据库文件名。
+    - schema: 建表 SQL 脚本（需使用 IF NOT EXISTS）。
+    - version: 表结构版本号，结构变化时递增。
+
+    返回:
+    - sqlite3.Connection: 数据库连接。
+    """
+    db_path = _index_db_path(root, file_name)
+    if db_path is not None:
+        for _ in range(2):
+            conn = None
+            try:
+                conn = _connect_file(db_path)
+                if conn.execute("PRAGMA user_version").fetchone()[0] == version:
+                    return conn
+                # 空库直接建表；旧版本的索引删除后重建
+                if not conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0]:
+                    _init_schema(conn, schema, version)
+                    return conn
+            except sqlite3.DatabaseError:
+                pass
+            if conn is not None:
+                conn.close()
+            _remove_db_files(db_path)
+
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    _init_schema(conn, schema, version)
+    return conn
+
+
+def open_writer(conn: sqlite3.Connection) -> Optional[sqlite3.Connection]:
+    """
+    为文件数据库再打开一个写连接，使后台更新期间的查询无需等待写入（WAL 模式下读写互不阻塞）。
+    内存数据库无法共享，返回 None，调用方应继续使用原连接并加锁。
+    """
+    db_path = conn.execute("PRAGMA database_list").fetchone()[2]
+    if not db_path:
+        return None
+    return _connect_file(db_path)
+
+
+def map_jobs(func: Callable[[T], R], jobs: List[T]) -> Iterator[R]:
+    """
+    按顺序产出 func 对每个任务的结果。任务较多时使用多进程并行执行，func 必须是可被 pickle 的模块级函数。
+
+    参数:
+    - func: 处理单个任务的函数。
+    - jobs: 任务列表。
+
+    返回:
+    - Iterator: 与 jobs 顺序一致的结果。
+    """
+    workers = min(os.cpu_count() or 1, MAX_WORKERS)
+    if len(jobs) < PARALLEL_THRESHOLD or workers <= 1:
+        yield from map(func, jobs)
+        return
+    # 调用方通常运行在工具的工作线程中，使用 spawn 避免 fork 多线程进程导致的死锁
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        yield from executor.map(func, jobs, chunksize=32)
+
+
+class IndexCache(Generic[T]):
+    """
+    按根目录缓存索引实例，并在后台线程中做节流的增量扫描，查询不会等待目录树扫描。
+    只有索引首次构建时，查询最多等待 first_build_timeout 秒，超时后基于已提交的部分结果查询。
+    索引对象需提供 update() 方法，且能在更新期间被并发查询；
+    可选提供 is_empty() 方法，已有持久化数据的索引无需等待首次构建。
+    """
+
+    def __init__(self, factory: Callable[[str], T], refresh_interval: float = 30,
+                 first_build_timeout: float = 10):
+        self.factory = factory
+        self.refresh_interval = refresh_interval
+        self.first_build_timeout = first_build_timeout
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, T] = {}
+        self._last_refresh: Dict[str, float] = {}
+        self._refreshing: Dict[str, threading.Thread] = {}
+        self._built: Dict[str, threading.Event] = {}
+
+    def get(self, root: str, refresh: bool = True) -> T:
+        """
+        获取指定根目录的索引。
+
+        参数:
+        - root: 索引的根目录（绝对路径）。
+        - refresh: 是否在距上次扫描超过 refresh_interval 秒时于后台启动一次增量更新。
+
+        返回:
+        - 索引实例。
+        """
+        with self._lock:
+            index = self._indexes.get(root)
+            if index is None:
+                index = self.factory(root)
+                self._indexes[root] = index
+                self._built[root] = threading.Event()
+                is_empty = getattr(index, "is_empty", None)
+                if is_empty is not None and not is_empty():
+                    self._built[root].set()
+            built = self._built[root]
+
+            if refresh and root not in self._refreshing:
+                now = time.monotonic()
+                if now - self._last_refresh.get(root, float('-inf')) >= self.refresh_interval:
+                    self._last_refresh[root] = now
+                    worker = threading.Thread(target=self._refresh, args=(root, index), daemon=True)
+                    self._refreshing[root] = worker
+                    worker.start()
+
+        if refresh and not built.is_set():
+            built.wait(self.first_build_timeout)
+        return index
+
+    def _refresh(self, root: str, index: T):
+        try:
+            index.update()
+        finally:
+            with self._lock:
+                self._refreshing.pop(root, None)
+                self._built[root].set()
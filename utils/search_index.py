@@ -0,0 +1,361 @@
+import os
+import re
+import stat
+import heapq
+import zlib
+import fnmatch
+import sqlite3
+import threading
+import subprocess
+from collections import Counter
+from contextlib import nullcontext
+from functools import lru_cache
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+from utils.index_store import map_jobs, open_index_db, open_writer
+
+
+SEARCH_INDEX_FILE = "search_index.db"
+# 索引表结构版本，结构变化时递增以触发重建
+SEARCH_SCHEMA_VERSION = 2
+
+# 遍历时忽略的目录，与 project_structure 保持一致，并额外忽略虚拟环境、工具缓存和构建产物。
+# 根目录是 git 工作区时以 .gitignore 为准，这里的规则只作为补充
+IGNORE_DIRS = {
+    '.git', '__pycache__', '.idea', '.vscode', 'node_modules', '.venv', 'venv', 'env',
+    '.mypy_cache', '.pytest_cache', '.ruff_cache', '.tox', '.nox', 'build', 'dist', 'target',
+}
+
+# 压缩或生成的文件对检索没有帮助
+IGNORE_FILE_PATTERNS = ('*.min.js', '*.min.css', '*.map')
+
+# 超过该大小的文件（通常是数据或构建产物）不进入索引
+MAX_FILE_SIZE = 1024 * 1024
+
+# 每批提交的文件数，首次构建时分批提交，避免长时间占用写事务并让查询尽早看到结果
+BATCH_SIZE = 500
+
+_WORD_RE = re.compile(r"[A-Za-z0-9_]+")
+_CJK_RE = re.compile(r"[\u4e00-\u9fff]+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+@dataclass
+class SearchHit:
+    """搜索结果：文件路径、BM25 得分以及最相关的代码片段。"""
+    path: str
+    score: float
+    snippets: List[str] = field(default_factory=list)
+
+
+@lru_cache(maxsize=1 << 16)
+def _split_identifier(word: str) -> Tuple[str, ...]:
+    """将单个标识符切分为完整形式和 snake_case / camelCase 子词。标识符大量重复，因此做缓存。"""
+    parts = [p.lower() for piece in word.split('_') for p in _CAMEL_RE.findall(piece)]
+    full = word.lower().strip('_')
+    terms = [full] if len(full) > 1 else []
+    if len(parts) > 1:
+        terms.extend(p for p in parts if len(p) > 1 and p != full)
+    return tuple(terms)
+
+
+def _cjk_bigrams(run: str) -> List[str]:
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    将文本切分为检索词。
+    标识符会同时保留完整形式和按 snake_case / camelCase 拆分后的子词，
+    中文按相邻两字切分（bigram），所有词统一转为小写。
+
+    参数:
+    - text: 要切分的文本。
+
+    返回:
+    - List[str]: 检索词列表（可能包含重复项，用于统计词频）。
+    """
+    tokens = []
+    for word in _WORD_RE.findall(text):
+        tokens.extend(_split_identifier(word))
+    for run in _CJK_RE.findall(text):
+        tokens.extend(_cjk_bigrams(run))
+    return tokens
+
+
+def count_terms(text: str) -> Counter:
+    """
+    统计文本中各检索词的词频，结果与 Counter(tokenize(text)) 相同。
+    先按原始单词计数再切分，每个不同的单词只切分一次，用于大文件建索引。
+    """
+    counts = Counter()
+    for word, n in Counter(_WORD_RE.findall(text)).items():
+        for term in _split_identifier(word):
+            counts[term] += n
+    for run, n in Counter(_CJK_RE.findall(text)).items():
+        for term in _cjk_bigrams(run):
+            counts[term] += n
+    return counts
+
+
+def _git_files(root: str) -> Optional[List[str]]:
+    """根目录位于 git 工作区时，返回未被 .gitignore 忽略的文件（相对路径）；否则返回 None。"""
+    try:
+        output = subprocess.check_output(
+            ['git', '-C', root, 'ls-files', '-co', '--exclude-standard', '-z'],
+            stderr=subprocess.DEVNULL,
+        )
+    except (subprocess.CalledProcessError, OSError):
+        return None
+    return [p for p in output.decode('utf-8', errors='surrogateescape').split('\0') if p]
+
+
+def _walk_files(root: str) -> Iterator[str]:
+    """不在 git 工作区时遍历目录树，产出文件相对路径。"""
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in IGNORE_DIRS:
+                                stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            yield os.path.relpath(entry.path, root)
+                    except OSError:
+                        # 无法访问的条目直接跳过
+                        continue
+        except OSError:
+            continue
+
+
+def iter_source_files(root: str) -> Iterator[Tuple[str, float, int]]:
+    """
+    列出可索引的文件。根目录是 git 工作区时使用 git ls-files（遵循 .gitignore），否则遍历目录树。
+
+    参数:
+    - root: 要遍历的根目录（绝对路径）。
+
+    返回:
+    - Iterator[Tuple[str, float, int]]: (相对路径, 修改时间, 文件大小) 元组。
+    """
+    rel_paths = _git_files(root)
+    if rel_paths is None:
+        rel_paths = _walk_files(root)
+
+    for rel_path in rel_paths:
+        parts = rel_path.replace(os.sep, '/').split('/')
+        if any(part in IGNORE_DIRS for part in parts[:-1]):
+            continue
+        if any(fnmatch.fnmatch(parts[-1], pattern) for pattern in IGNORE_FILE_PATTERNS):
+            continue
+        try:
+            info = os.lstat(os.path.join(root, rel_path))
+        except OSError:
+            # 已删除但仍被 git 跟踪、或无法访问的文件
+            continue
+        if stat.S_ISREG(info.st_mode) and info.st_size <= MAX_FILE_SIZE:
+            yield os.path.normpath(rel_path), info.st_mtime, info.st_size
+
+
+def read_text_file(file_path: str) -> Optional[str]:
+    """读取文本文件内容；二进制文件或无法读取的文件返回 None。"""
+    try:
+        with open(file_path, 'rb') as f:
+            data = f.read()
+    except (IOError, OSError):
+        return None
+    # 与 git 的判断方式一致：前 8KB 中出现 NUL 字节即视为二进制文件
+    if b'\0' in data[:8192]:
+        return None
+    return data.decode('utf-8', errors='ignore')
+
+
+def _bag_of_words(rel_path: str, text: str) -> str:
+    """
+    将文件路径和内容切分为检索词，按词排序后拼接为 FTS5 文档。
+    每个词重复其词频次，保证 BM25 使用的词频和文档长度不变；排序使同一内容总能还原出相同的文档。
+    """
+    # 路径本身也参与检索，便于按模块名命中文件
+    counts = count_terms(rel_path)
+    counts.update(count_terms(text))
+    return "".join((term + " ") * tf for term, tf in sorted(counts.items())).rstrip()
+
+
+def _index_file(args: Tuple[str, str]) -> Optional[str]:
+    """读取单个文件并生成 FTS5 文档，供多进程调用；二进制或无法读取的文件返回 None。"""
+    root, rel_path = args
+    text = read_text_file(os.path.join(root, rel_path))
+    return None if text is None else _bag_of_words(rel_path, text)
+
+
+class SearchIndex:
+    """
+    基于 SQLite FTS5 的持久化倒排索引，支持按 mtime 增量更新和 BM25 排序查询。
+    文件先经 tokenize 切分，再以词袋形式写入 FTS5，文档频率和 BM25 打分均由 SQLite 完成。
+    查询连接可被多个线程共享，通过 lock 串行执行；更新使用单独的写连接按批提交，不阻塞查询。
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.lock = threading.RLock()
+        self._update_lock = threading.Lock()
+        self.conn = open_index_db(
+            self.root,
+            SEARCH_INDEX_FILE,
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE NOT NULL,
+                mtime REAL NOT NULL,
+                size INTEGER NOT NULL,
+                terms BLOB
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5(
+                tokens,
+                content='',
+                tokenize="unicode61 remove_diacritics 0 tokenchars '_'"
+            );
+            """,
+            SEARCH_SCHEMA_VERSION,
+        )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def is_empty(self) -> bool:
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM files LIMIT 1").fetchone() is None
+
+    def update(self) -> int:
+        """
+        增量更新索引：只重新索引新增或 mtime/大小发生变化的文件，并删除已不存在的文件。
+        二进制或无法读取的文件也会记录（不含检索词），之后不再重复读取。
+
+        返回:
+        - int: 本次新增、更新或删除的文件数量。
+        """
+        with self._update_lock:
+            writer = open_writer(self.conn)
+            try:
+                return self._update(writer or self.conn)
+            finally:
+                if writer is not None:
+                    writer.close()
+
+    def _update(self, conn: sqlite3.Connection) -> int:
+        with self._writing(conn):
+            known = {
+                path: (mtime, size)
+                for path, mtime, size in conn.execute("SELECT path, mtime, size FROM files")
+            }
+
+        pending = []
+        for rel_path, mtime, size in iter_source_files(self.root):
+            old = known.pop(rel_path, None)
+            if old != (mtime, size):
+                pending.append((rel_path, mtime, size))
+
+        # 读取和分词不占用数据库（文件较多时并行），结果分批写入提交
+        bags = map_jobs(_index_file, [(self.root, rel_path) for rel_path, _, _ in pending])
+        batch = []
+        for (rel_path, mtime, size), bag in zip(pending, bags):
+            batch.append((rel_path, mtime, size, bag))
+            if len(batch) >= BATCH_SIZE:
+                self._write_batch(conn, batch)
+                batch = []
+        if batch:
+            self._write_batch(conn, batch)
+
+        # 剩下的都是已被删除的文件
+        if known:
+            with self._writing(conn), conn:
+                for rel_path in known:
+                    self._remove(conn, rel_path)
+
+        return len(pending) + len(known)
+
+    def _writing(self, conn: sqlite3.Connection):
+        """写入共享的查询连接（内存数据库）时需要持有 lock，单独的写连接则不需要。"""
+        return self.lock if conn is self.conn else nullcontext()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[Tuple[str, float, int, Optional[str]]]):
+        with self._writing(conn), conn:
+            for rel_path, mtime, size, bag in batch:
+                self._remove(conn, rel_path)
+                self._insert(conn, rel_path, mtime, size, bag)
+
+    def _insert(self, conn: sqlite3.Connection, rel_path: str, mtime: float, size: int, bag: Optional[str]):
+        cursor = conn.execute(
+            "INSERT INTO files (path, mtime, size, terms) VALUES (?, ?, ?, ?)",
+            (rel_path, mtime, size, None if bag is None else zlib.compress(bag.encode('utf-8'))),
+        )
+        if bag is not None:
+            conn.execute("INSERT INTO docs (rowid, tokens) VALUES (?, ?)", (cursor.lastrowid, bag))
+
+    def _remove(self, conn: sqlite3.Connection, rel_path: str):
+        row = conn.execute("SELECT id, terms FROM files WHERE path = ?", (rel_path,)).fetchone()
+        if row is None:
+            return
+        file_id, terms = row
+        if terms is not None:
+            # contentless FTS5 表删除时需要提供原始内容，因此 files 表中保存了压缩后的词袋
+            conn.execute(
+                "INSERT INTO docs (docs, rowid, tokens) VALUES ('delete', ?, ?)",
+                (file_id, zlib.decompress(terms).decode('utf-8')),
+            )
+        conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def search(self, query: str, top_k: int = 10) -> List[SearchHit]:
+        """
+        使用 BM25 对索引中的文件排序。
+
+        参数:
+        - query: 自然语言或标识符查询。
+        - top_k: 返回的最大结果数。
+
+        返回:
+        - List[SearchHit]: 按得分从高到低排列的结果，包含相关代码片段。
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        match = " OR ".join(f'"{term}"' for term in sorted(terms))
+
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT f.path, r.score FROM ("
+                "  SELECT rowid, rank AS score FROM docs WHERE docs MATCH ? ORDER BY rank LIMIT ?"
+                ") r JOIN files f ON f.id = r.rowid ORDER BY r.score",
+                (match, top_k),
+            ).fetchall()
+
+        # FTS5 的 bm25() 越小越相关，这里取反以便与常见的 BM25 得分方向一致
+        return [
+            SearchHit(path=path, score=round(-score, 4), snippets=self._snippets(path, terms))
+            for path, score in rows
+        ]
+
+    def _snippets(self, rel_path: str, terms: set, max_snippets: int = 3, max_width: int = 200) -> List[str]:
+        """挑选命中查询词最多的几行，格式为 "行号: 内容"。"""
+        text = read_text_file(os.path.join(self.root, rel_path))
+        if not text:
+            return []
+
+        # 检索词都是小写原文的子串，用一个正则统计每行命中的不同检索词，无需逐行分词
+        pattern = re.compile("|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True)))
+        scored = []
+        lines = text.splitlines()
+        for line_no, (line, lowered) in enumerate(zip(lines, text.lower().splitlines()), start=1):
+            matched = set(pattern.findall(lowered))
+            if matched:
+                scored.append((len(matched), -line_no, line))
+
+        best = heapq.nlargest(max_snippets, scored)
+        best.sort(key=lambda item: -item[1])
+        return [f"{-neg_line}: {line.strip()[:max_width]}" for _, neg_line, line in best]
@@ -0,0 +1,448 @@
+import os
+import re
+import ast
+import sqlite3
+import threading
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from utils.index_store import map_jobs, open_index_db, open_writer
+from utils.search_index import BATCH_SIZE, iter_source_files, read_text_file
+
+
+SYMBOL_INDEX_FILE = "symbol_index.db"
+# 索引表结构版本，结构变化时递增以触发重建
+SYMBOL_SCHEMA_VERSION = 2
+
+# 正则解析时，定义行之后最多向后查找多少行来寻找代码块的起始 "{"
+MAX_SIGNATURE_LINES = 10
+
+# 可以包含其他定义的符号类型，用于推断正则解析结果的限定名
+_CONTAINER_KINDS = {"class", "interface", "struct", "enum", "trait", "object", "module", "record", "impl", "mod"}
+
+# 非 Python 语言使用的轻量级正则解析规则：(类型, 正则)。
+# 正则中 name 分组为符号名，可选的 kind 分组会覆盖默认类型。
+_JS_RULES = [
+    ("function", re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*(?P<name>[\w$]+)")),
+    ("class", re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:abstract\s+)?class\s+(?P<name>[\w$]+)")),
+    ("interface", re.compile(r"^\s*(?:export\s+)?interface\s+(?P<name>[\w$]+)")),
+    ("type", re.compile(r"^\s*(?:export\s+)?type\s+(?P<name>[\w$]+)\s*(?:<[^=]*>)?\s*=")),
+    ("function", re.compile(r"^\s*(?:export\s+)?(?:const|let|var)\s+(?P<name>[\w$]+)\s*(?::[^=]+)?=\s*(?:async\s+)?(?:\([^)]*\)|[\w$]+)\s*(?::[^=]+)?=>")),
+    # 类中的方法：缩进的 "name(...) {"，排除控制语句和以回调为参数的函数调用
+    ("method", re.compile(r"^\s+(?!(?:if|for|while|switch|catch|function|return|else|do|with)\b)(?:(?:public|private|protected|static|readonly|abstract|override|async|get|set)\s+)*(?:\*\s*)?(?P<name>[\w$#]+)\s*(?:<[^>]*>)?\s*\((?:(?!=>|function)[^;])*\)\s*(?::\s*[^={;]+)?\{\s*$")),
+]
+
+_LANGUAGE_RULES = {
+    ".py": [
+        ("class", re.compile(r"^\s*class\s+(?P<name>\w+)")),
+        ("function", re.compile(r"^\s*(?:async\s+)?def\s+(?P<name>\w+)")),
+    ],
+    ".js": _JS_RULES,
+    ".jsx": _JS_RULES,
+    ".mjs": _JS_RULES,
+    ".ts": _JS_RULES,
+    ".tsx": _JS_RULES,
+    ".go": [
+        ("function", re.compile(r"^func\s+(?:\([^)]*\)\s*)?(?P<name>\w+)")),
+        ("type", re.compile(r"^type\s+(?P<name>\w+)\s+(?P<kind>struct|interface)\b")),
+    ],
+    ".rs": [
+        ("function", re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:const\s+)?(?:async\s+)?(?:unsafe\s+)?fn\s+(?P<name>\w+)")),
+        ("type", re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?P<kind>struct|enum|trait|mod)\s+(?P<name>\w+)")),
+        ("impl", re.compile(r"^\s*(?:unsafe\s+)?impl(?:<[^>]*>)?\s+(?:[\w:]+(?:<[^>]*>)?\s+for\s+)?(?P<name>\w+)")),
+    ],
+    ".java": [
+        ("class", re.compile(r"^\s*(?:(?:public|private|protected|static|final|abstract|sealed)\s+)*(?P<kind>class|interface|enum|record)\s+(?P<name>\w+)")),
+        # 方法和构造函数："[修饰符] [泛型] 返回类型 name(...) [throws ...] [{ 或 ;]"
+        ("method", re.compile(r"^\s*(?!(?:if|for|while|switch|catch|return|new|else|throw|synchronized|assert|yield|case)\b)(?:(?:public|private|protected|static|final|abstract|synchronized|native|default|strictfp)\s+)*(?:<[^>]*>\s+)?[\w.$]+(?:<[^;{}()]*>)?(?:\[\])*\s+(?P<name>[\w$]+)\s*\([^;{}]*\)\s*(?:throws\s+[\w.$,\s]+)?[{;]?\s*$")),
+    ],
+    ".kt": [
+        ("class", re.compile(r"^\s*(?:(?:public|private|protected|internal|open|abstract|sealed|data|enum)\s+)*(?P<kind>class|interface|object)\s+(?P<name>\w+)")),
+        ("function", re.compile(r"^\s*(?:(?:public|private|protected|internal|open|override|suspend|inline)\s+)*fun\s+(?:<[^>]*>\s*)?(?:[\w.]+\.)?(?P<name>\w+)")),
+    ],
+    ".c": [
+        ("type", re.compile(r"^\s*(?:typedef\s+)?(?P<kind>struct|enum|union)\s+(?P<name>\w+)\s*\{")),
+        ("function", re.compile(r"^(?!\s*(?:if|for|while|switch|return|else)\b)[A-Za-z_][\w\s\*&:<>,]*?\b(?P<name>\w+)\s*\([^;]*\)\s*\{?\s*$")),
+    ],
+    ".rb": [
+        ("class", re.compile(r"^\s*(?P<kind>class|module)\s+(?P<name>[\w:]+)")),
+        ("function", re.compile(r"^\s*def\s+(?:self\.)?(?P<name>\w+[?!=]?)")),
+    ],
+    ".php": [
+        ("class", re.compile(r"^\s*(?:(?:abstract|final)\s+)*(?P<kind>class|interface|trait)\s+(?P<name>\w+)")),
+        ("function", re.compile(r"^\s*(?:(?:public|private|protected|static|abstract|final)\s+)*function\s+&?(?P<name>\w+)")),
+    ],
+}
+_LANGUAGE_RULES[".h"] = _LANGUAGE_RULES[".c"]
+_LANGUAGE_RULES[".cpp"] = _LANGUAGE_RULES[".cc"] = _LANGUAGE_RULES[".hpp"] = [
+    ("class", re.compile(r"^\s*(?:template\s*<[^>]*>\s*)?(?P<kind>class|struct)\s+(?P<name>\w+)\s*(?:final\s*)?[:{]")),
+] + _LANGUAGE_RULES[".c"]
+
+
+@dataclass
+class Symbol:
+    """符号定义信息：所在文件、名称、限定名、类型、起止行号及签名。"""
+    path: str
+    name: str
+    qualname: str
+    kind: str
+    line: int
+    end_line: int
+    signature: str
+
+
+def is_supported(file_path: str) -> bool:
+    """检查文件扩展名是否在支持解析的语言范围内。"""
+    return os.path.splitext(file_path)[1].lower() in _LANGUAGE_RULES
+
+
+def _parse_python(rel_path: str, text: str) -> List[Symbol]:
+    """使用 ast 解析 Python 源码中的类、函数和方法。"""
+    tree = ast.parse(text)
+    symbols = []
+
+    def visit(body: List[ast.stmt], parent: str, in_class: bool):
+        # 只遍历语句体，定义只可能出现在语句中，无需深入表达式
+        for child in body:
+            if isinstance(child, ast.ClassDef):
+                kind = "class"
+                bases = ", ".join(ast.unparse(b) for b in child.bases)
+                signature = f"class {child.name}({bases})" if bases else f"class {child.name}"
+            elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                kind = "method" if in_class else "function"
+                prefix = "async def" if isinstance(child, ast.AsyncFunctionDef) else "def"
+                returns = f" -> {ast.unparse(child.returns)}" if child.returns else ""
+                signature = f"{prefix} {child.name}({ast.unparse(child.args)}){returns}"
+            else:
+                for field_name in ("body", "orelse", "finalbody"):
+                    visit(getattr(child, field_name, None) or [], parent, in_class)
+                for handler in getattr(child, "handlers", None) or []:
+                    visit(handler.body, parent, in_class)
+                for case in getattr(child, "cases", None) or []:
+                    visit(case.body, parent, in_class)
+                continue
+
+            qualname = f"{parent}.{child.name}" if parent else child.name
+            symbols.append(Symbol(
+                path=rel_path,
+                name=child.name,
+                qualname=qualname,
+                kind=kind,
+                line=child.lineno,
+                end_line=getattr(child, "end_lineno", None) or child.lineno,
+                signature=signature,
+            ))
+            visit(child.body, qualname, isinstance(child, ast.ClassDef))
+
+    visit(tree.body, "", False)
+    symbols.sort(key=lambda s: s.line)
+    return symbols
+
+
+# 计算括号层级前去掉字符串、字符字面量和行注释，避免其中的括号干扰
+_BRACE_NOISE_RE = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])\'|`[^`]*`|//.*')
+
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip())
+
+
+def _brace_block_end(lines: List[str], start: int) -> int:
+    """
+    返回从 start 行开始的大括号代码块的结束行（均为 0 起始）。
+    签名结束前没有出现 "{"（如声明、单行表达式）时，认为定义只有一行。
+    """
+    depth = 0
+    parens = 0
+    opened = False
+    for i in range(start, len(lines)):
+        for ch in lines[i]:
+            if ch == '(':
+                parens += 1
+            elif ch == ')':
+                parens -= 1
+            elif ch == '{':
+                depth += 1
+                opened = True
+            elif ch == '}':
+                depth -= 1
+                if opened and depth <= 0:
+                    return i
+            elif ch == ';' and not opened and parens <= 0:
+                return start
+        if not opened:
+            # 签名写完（括号闭合）且下一行不是单独的 "{" 时，说明没有代码块
+            next_line = lines[i + 1].lstrip() if i + 1 < len(lines) else ""
+            if (parens <= 0 and not next_line.startswith('{')) or i - start >= MAX_SIGNATURE_LINES:
+                return start
+    return len(lines) - 1 if opened else start
+
+
+def _indent_block_end(lines: List[str], start: int, closing: Optional[str]) -> int:
+    """
+    返回按缩进划分的代码块的结束行（均为 0 起始）。
+    closing 为结束关键字（如 Ruby 的 "end"），遇到同级缩进的该关键字即结束；为 None 时（Python）块在下一个同级语句之前结束。
+    """
+    base = _indent(lines[start])
+    end = start
+    for i in range(start + 1, len(lines)):
+        stripped = lines[i].strip()
+        if not stripped:
+            continue
+        if _indent(lines[i]) <= base:
+            if closing is not None and stripped.split()[0] == closing:
+                return i
+            break
+        end = i
+    return end
+
+
+def _parse_with_rules(rel_path: str, text: str, rules) -> List[Symbol]:
+    """
+    使用正则规则逐行解析符号定义。
+    结束行按语言的代码块形式推断（大括号、缩进或 end 关键字），
+    并据此把嵌套在类等容器内的定义归入其限定名，容器中的函数记为方法。
+    """
+    ext = os.path.splitext(rel_path)[1].lower()
+    lines = text.splitlines()
+    symbols = []
+    for line_no, line in enumerate(lines, start=1):
+        for kind, regex in rules:
+            match = regex.match(line)
+            if match:
+                name = match.group("name")
+                symbols.append(Symbol(
+                    path=rel_path,
+                    name=name,
+                    qualname=name,
+                    kind=match.groupdict().get("kind") or kind,
+                    line=line_no,
+                    end_line=line_no,
+                    signature=line.strip()[:200],
+                ))
+                break
+
+    if ext == ".py":
+        block_end = lambda start: _indent_block_end(lines, start, None)
+    elif ext == ".rb":
+        block_end = lambda start: _indent_block_end(lines, start, "end")
+    else:
+        cleaned = [_BRACE_NOISE_RE.sub("", line) for line in lines]
+        block_end = lambda start: _brace_block_end(cleaned, start)
+
+    containers: List[Symbol] = []
+    for symbol in symbols:
+        symbol.end_line = block_end(symbol.line - 1) + 1
+        while containers and containers[-1].end_line < symbol.line:
+            containers.pop()
+        if containers:
+            symbol.qualname = f"{containers[-1].qualname}.{symbol.name}"
+            if symbol.kind == "function":
+                symbol.kind = "method"
+        if symbol.kind in _CONTAINER_KINDS and symbol.end_line > symbol.line:
+            containers.append(symbol)
+    return symbols
+
+
+def parse_symbols(rel_path: str, text: str) -> List[Symbol]:
+    """
+    解析源码中的符号定义。
+    Python 使用 ast 解析；其他语言（或存在语法错误的 Python 文件）使用正则解析。
+
+    参数:
+    - rel_path: 文件相对路径，用于判断语言并写入结果。
+    - text: 文件内容。
+
+    返回:
+    - List[Symbol]: 按行号排序的符号列表。
+    """
+    ext = os.path.splitext(rel_path)[1].lower()
+    rules = _LANGUAGE_RULES.get(ext)
+    if rules is None:
+        return []
+    if ext == ".py":
+        try:
+            return _parse_python(rel_path, text)
+        except (SyntaxError, ValueError, RecursionError, MemoryError):
+            # 语法错误或嵌套过深的表达式退回到正则解析
+            pass
+    return _parse_with_rules(rel_path, text, rules)
+
+
+def _parse_file(args: Tuple[str, str]) -> List[Symbol]:
+    """
+    读取并解析单个文件，供多进程调用。
+    二进制、无法读取或解析失败的文件记为没有符号，不影响整体构建，之后也不会重复读取。
+    """
+    root, rel_path = args
+    text = read_text_file(os.path.join(root, rel_path))
+    if text is None:
+        return []
+    try:
+        return parse_symbols(rel_path, text)
+    except Exception:
+        return []
+
+
+class SymbolIndex:
+    """
+    基于 SQLite 的持久化符号索引，记录各文件的定义/大纲信息，并按 mtime 增量更新。
+    查询连接可被多个线程共享，通过 lock 串行执行；更新使用单独的写连接按批提交，不阻塞查询。
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.lock = threading.RLock()
+        self._update_lock = threading.Lock()
+        self.conn = open_index_db(
+            self.root,
+            SYMBOL_INDEX_FILE,
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE NOT NULL,
+                mtime REAL NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS symbols (
+                file_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                qualname TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                line INTEGER NOT NULL,
+                end_line INTEGER NOT NULL,
+                signature TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_symbols_file ON symbols(file_id);
+            CREATE INDEX IF NOT EXISTS idx_symbols_name ON symbols(name COLLATE NOCASE);
+            CREATE INDEX IF NOT EXISTS idx_symbols_qualname ON symbols(qualname COLLATE NOCASE);
+            """,
+            SYMBOL_SCHEMA_VERSION,
+        )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def is_empty(self) -> bool:
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM files LIMIT 1").fetchone() is None
+
+    def update(self) -> int:
+        """
+        增量更新索引：只重新解析新增或 mtime/大小发生变化的文件，并删除已不存在的文件。
+        待解析文件较多时（如首次构建）使用多进程并行解析。
+
+        返回:
+        - int: 本次新增、更新或删除的文件数量。
+        """
+        with self._update_lock:
+            writer = open_writer(self.conn)
+            try:
+                return self._update(writer or self.conn)
+            finally:
+                if writer is not None:
+                    writer.close()
+
+    def _update(self, conn: sqlite3.Connection) -> int:
+        with self._writing(conn):
+            known = {
+                path: (mtime, size)
+                for path, mtime, size in conn.execute("SELECT path, mtime, size FROM files")
+            }
+
+        pending = []
+        for rel_path, mtime, size in iter_source_files(self.root):
+            if not is_supported(rel_path):
+                continue
+            old = known.pop(rel_path, None)
+            if old != (mtime, size):
+                pending.append((rel_path, mtime, size))
+
+        parsed = map_jobs(_parse_file, [(self.root, rel_path) for rel_path, _, _ in pending])
+        batch = []
+        for (rel_path, mtime, size), symbols in zip(pending, parsed):
+            batch.append((rel_path, mtime, size, symbols))
+            if len(batch) >= BATCH_SIZE:
+                self._write_batch(conn, batch)
+                batch = []
+        if batch:
+            self._write_batch(conn, batch)
+
+        # 剩下的都是已被删除的文件
+        if known:
+            with self._writing(conn), conn:
+                for rel_path in known:
+                    self._remove(conn, rel_path)
+
+        return len(pending) + len(known)
+
+    def refresh_file(self, rel_path: str):
+        """只检查并按需重新解析单个文件，用于无需全量扫描的大纲查询。"""
+        try:
+            info = os.stat(os.path.join(self.root, rel_path))
+        except OSError:
+            info = None
+
+        with self.lock:
+            row = self.conn.execute("SELECT mtime, size FROM files WHERE path = ?", (rel_path,)).fetchone()
+            if row is not None and info is not None and row == (info.st_mtime, info.st_size):
+                return
+
+        symbols = _parse_file((self.root, rel_path)) if info is not None else None
+        with self.lock, self.conn:
+            self._remove(self.conn, rel_path)
+            if symbols is not None:
+                self._insert(self.conn, rel_path, info.st_mtime, info.st_size, symbols)
+
+    def _writing(self, conn: sqlite3.Connection):
+        """写入共享的查询连接（内存数据库）时需要持有 lock，单独的写连接则不需要。"""
+        return self.lock if conn is self.conn else nullcontext()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[Tuple[str, float, int, List[Symbol]]]):
+        with self._writing(conn), conn:
+            for rel_path, mtime, size, symbols in batch:
+                self._remove(conn, rel_path)
+                self._insert(conn, rel_path, mtime, size, symbols)
+
+    def _insert(self, conn: sqlite3.Connection, rel_path: str, mtime: float, size: int, symbols: List[Symbol]):
+        cursor = conn.execute(
+            "INSERT INTO files (path, mtime, size) VALUES (?, ?, ?)",
+            (rel_path, mtime, size),
+        )
+        conn.executemany(
+            "INSERT INTO symbols (file_id, name, qualname, kind, line, end_line, signature) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((cursor.lastrowid, s.name, s.qualname, s.kind, s.line, s.end_line, s.signature) for s in symbols),
+        )
+
+    def _remove(self, conn: sqlite3.Connection, rel_path: str):
+        row = conn.execute("SELECT id FROM files WHERE path = ?", (rel_path,)).fetchone()
+        if row is None:
+            return
+        conn.execute("DELETE FROM symbols WHERE file_id = ?", (row[0],))
+        conn.execute("DELETE FROM files WHERE id = ?", (row[0],))
+
+    def outline(self, rel_path: str) -> List[Symbol]:
+        """返回单个文件中按行号排序的全部符号定义。"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT f.path, s.name, s.qualname, s.kind, s.line, s.end_line, s.signature "
+                "FROM symbols s JOIN files f ON f.id = s.file_id WHERE f.path = ? ORDER BY s.line",
+                (rel_path,),
+            ).fetchall()
+        return [Symbol(*row) for row in rows]
+
+    def find_definition(self, name: str, limit: int = 50) -> List[Symbol]:
+        """
+        按名称查找符号定义。
+        name 可以是简单名称（如 "read"）或限定名（如 "SearchIndex.update"），不区分大小写。
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT f.path, s.name, s.qualname, s.kind, s.line, s.end_line, s.signature "
+                "FROM symbols s JOIN files f ON f.id = s.file_id "
+                "WHERE s.name = ?1 COLLATE NOCASE OR s.qualname = ?1 COLLATE NOCASE "
+                "ORDER BY (s.name = ?1 OR s.qualname = ?1) DESC, f.path, s.line LIMIT ?2",
+                (name, limit),
+            ).fetchall()
+        return [Symbol(*row) for row in rows]